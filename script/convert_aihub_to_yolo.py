@@ -21,21 +21,61 @@ AI-Hub 갈색거저리 데이터셋의 주석(JSON)을 YOLO 라벨 형식(.txt)
         --json-dir ./data/labels_json \\
         --out-labels ./data/labels_yolo \\
         --class-mode status --status-map "NM:0,AB:1"
+
+    # 3. 라벨 파일을 개별 .txt 대신 하나의 tar 파일로 저장 (소형 파일이 많은 경우 파일시스템 부하 감소)
+    python convert_aihub_to_yolo.py \\
+        --json-dir ./data/labels_json \\
+        --out-tar ./data/labels_yolo.tar
 """
 import argparse
+import io
 import json
+import math
+import os
 import sys
+import tarfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache, partial
 from pathlib import Path
 
+import numpy as np
+
+# orjson이 설치되어 있으면 사용하고 (표준 json 대비 파싱 속도가 빠름), 없으면 표준 json으로 대체
+try:
+    import orjson
+except ImportError:
+    import json as orjson
+
+# ijson이 설치되어 있으면 큰 JSON 파일을 스트리밍으로 파싱합니다 (설치된 경우 yajl2_c 백엔드를 자동 선택)
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+# numba가 설치되어 있으면 좌표 정규화 커널을 JIT 컴파일하여 사용합니다
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+# 이 크기 이상인 JSON 파일은 ijson으로 스트리밍 파싱 (POLYGON 좌표 등으로 커진 파일의 메모리 사용량 절감)
+STREAM_PARSE_MIN_BYTES = 8 * 1024 * 1024
+
+# YOLO 라벨 한 줄의 형식: <class_id> <x_center> <y_center> <width> <height>
+YOLO_LINE_FMT = "%d %.6f %.6f %.6f %.6f"
+
+@lru_cache(maxsize=None)
 def parse_status_map(s: str):
     """
-    문자열 형태의 상태 매핑을 딕셔너리로 변환합니다.
+    문자열 형태의 상태 매핑을 (상태, ID) 쌍의 튜플로 변환합니다.
+    같은 문자열은 한 번만 파싱하도록 캐시하며, 호출하는 쪽에서 dict()로 변환해 사용합니다.
     입력 예시: 'NM:0,AB:1,NG:1'
-    출력 예시: {'NM': 0, 'AB': 1, 'NG': 1}
+    출력 예시: (('NM', 0), ('AB', 1), ('NG', 1))
     """
-    mapping = {}
     if not s:
-        return mapping
+        return ()
+    mapping = {}
     for pair in s.split(","):
         pair = pair.strip()
         if not pair:
@@ -48,143 +88,333 @@ def parse_status_map(s: str):
         if not v.isdigit():
             raise ValueError(f"status-map의 클래스 ID는 정수여야 합니다: {pair}")
         mapping[k] = int(v)
-    return mapping
+    return tuple(mapping.items())
+
+@lru_cache(maxsize=None)
+def status_class_names(s: str):
+    """
+    상태 매핑 문자열로부터 classes.txt에 기록할 클래스 이름 목록(ID 순서)을 만듭니다.
+    같은 ID에 여러 상태가 매핑되면 마지막 상태를 사용하고, 비어 있는 ID는 'cls_{ID}'로 채웁니다.
+    """
+    inv = {v: k for k, v in parse_status_map(s)}
+    max_id = max(inv.keys()) if inv else -1
+    return tuple(inv.get(i, f"cls_{i}") for i in range(max_id + 1))
+
+def positive_int(s: str) -> int:
+    """argparse용 타입: 1 이상의 정수만 허용합니다."""
+    try:
+        value = int(s)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"정수가 아닙니다: {s}")
+    if value < 1:
+        raise argparse.ArgumentTypeError(f"1 이상의 정수여야 합니다: {s}")
+    return value
 
 def ensure_dir(p: Path):
     """디렉토리가 없으면 생성합니다 (상위 디렉토리 포함)."""
     p.mkdir(parents=True, exist_ok=True)
 
+def _normalize_boxes_np(xywh, inv_w, inv_h, out):
+    """
+    (N, 4) 픽셀 좌표 (x, y, w, h)를 YOLO 정규화 좌표 (x_center, y_center, w, h)로 변환해 out에 기록합니다.
+    inv_w, inv_h는 이미지 너비/높이의 역수이며 (나눗셈 대신 곱셈 사용), 결과는 0.0~1.0 사이로 클리핑됩니다.
+    (numba 미설치 시 사용하는 NumPy 구현)
+    """
+    out[:, 0] = (xywh[:, 0] + xywh[:, 2] * 0.5) * inv_w
+    out[:, 1] = (xywh[:, 1] + xywh[:, 3] * 0.5) * inv_h
+    out[:, 2] = xywh[:, 2] * inv_w
+    out[:, 3] = xywh[:, 3] * inv_h
+    np.clip(out, 0.0, 1.0, out=out)
+
+if njit is not None:
+    @njit(cache=True, fastmath=True)
+    def normalize_boxes(xywh, inv_w, inv_h, out):
+        """_normalize_boxes_np와 같은 계산을 임시 배열 없이 박스당 한 번의 루프로 수행합니다."""
+        for i in range(xywh.shape[0]):
+            x = xywh[i, 0]
+            y = xywh[i, 1]
+            w = xywh[i, 2]
+            h = xywh[i, 3]
+            out[i, 0] = min(max((x + w * 0.5) * inv_w, 0.0), 1.0)
+            out[i, 1] = min(max((y + h * 0.5) * inv_h, 0.0), 1.0)
+            out[i, 2] = min(max(w * inv_w, 0.0), 1.0)
+            out[i, 3] = min(max(h * inv_h, 0.0), 1.0)
+else:
+    normalize_boxes = _normalize_boxes_np
+
+# 정규화 결과를 담는 출력 버퍼 (파일마다 새로 할당하지 않고 프로세스 내에서 재사용)
+_norm_buf = np.empty((0, 4), dtype=np.float64)
+
+def get_norm_buf(n: int):
+    """박스 n개를 담을 수 있는 재사용 출력 버퍼의 (n, 4) 뷰를 반환합니다. 부족하면 크기를 늘립니다."""
+    global _norm_buf
+    if _norm_buf.shape[0] < n:
+        _norm_buf = np.empty((max(n, 2 * _norm_buf.shape[0]), 4), dtype=np.float64)
+    return _norm_buf[:n]
+
+def _stream_items(jf: str, prefix: str):
+    """ijson으로 JSON 파일에서 prefix 위치의 객체만 하나씩 읽어 반환합니다."""
+    with open(jf, "rb") as f:
+        yield from ijson.items(f, prefix, use_float=True)
+
+def load_annotation(jf: str):
+    """
+    JSON 주석 파일에서 변환에 필요한 info와 annotation 목록을 읽어옵니다.
+    파일이 STREAM_PARSE_MIN_BYTES 이상이고 ijson이 설치되어 있으면 문서 전체를 메모리에 올리지 않고
+    info를 먼저 읽은 뒤 annotation 항목을 하나씩 스트리밍하며 BOX 항목만 남깁니다.
+    orjson/ijson은 표준 json이 허용하는 NaN/Infinity 리터럴을 거부하므로, 파싱에 실패하면 표준 json으로 다시 읽습니다.
+
+    Returns:
+        (info, anns) 튜플
+    """
+    if ijson is not None and os.path.getsize(jf) >= STREAM_PARSE_MIN_BYTES:
+        try:
+            info = next(_stream_items(jf, "info"), None)
+            anns = [ann for ann in _stream_items(jf, "annotation.item") if ann.get("annotation_type") == "BOX"]
+            return info, anns
+        except ijson.JSONError:
+            pass  # 아래에서 문서 전체를 읽어 다시 시도
+
+    with open(jf, "rb") as f:
+        raw = f.read()
+    try:
+        data = orjson.loads(raw)
+    except orjson.JSONDecodeError:
+        data = json.loads(raw)
+    return data.get("info"), data.get("annotation", [])
+
+def collect_boxes_single(anns):
+    """
+    단일 클래스 모드: 모든 BOX를 클래스 0으로 수집합니다. (상태값 조회 없음)
+
+    Returns:
+        (boxes, class_ids, warnings) 튜플
+    """
+    # 어노테이션 수만큼 미리 할당해 두고 인덱스로 채운 뒤, 남는 부분은 잘라냅니다
+    boxes = [None] * len(anns)
+    n_box = 0
+    warnings = 0
+    for ann in anns:
+        if ann.get("annotation_type") != "BOX":
+            # BOX가 아닌 타입(예: POLYGON)은 건너뜁니다
+            continue
+
+        # 좌표 정보 추출 (딕셔너리 조회는 박스당 한 번씩만 하고 바로 튜플로 묶음)
+        pts = ann.get("points", {})
+        try:
+            box = (float(pts["x"]), float(pts["y"]), float(pts["width"]), float(pts["height"]))
+        except Exception:
+            warnings += 1
+            continue
+        # NaN/Infinity 좌표나 너비/높이가 0 이하인 박스는 제외
+        if not all(map(math.isfinite, box)) or box[2] <= 0 or box[3] <= 0:
+            warnings += 1
+            continue
+        boxes[n_box] = box
+        n_box += 1
+    del boxes[n_box:]
+    return boxes, [0] * n_box, warnings
+
+def collect_boxes_status(anns, status_to_id: dict):
+    """
+    상태 모드: object_status를 status_to_id로 매핑하여 BOX와 클래스 ID를 수집합니다.
+    매핑 정보에 없는 상태값의 박스는 경고로 집계하고 제외합니다.
+
+    Returns:
+        (boxes, class_ids, warnings) 튜플
+    """
+    # 어노테이션 수만큼 미리 할당해 두고 인덱스로 채운 뒤, 남는 부분은 잘라냅니다
+    boxes = [None] * len(anns)
+    class_ids = [0] * len(anns)
+    n_box = 0
+    warnings = 0
+    for ann in anns:
+        if ann.get("annotation_type") != "BOX":
+            # BOX가 아닌 타입(예: POLYGON)은 건너뜁니다
+            continue
+
+        # 좌표 정보 추출 (딕셔너리 조회는 박스당 한 번씩만 하고 바로 튜플로 묶음)
+        pts = ann.get("points", {})
+        try:
+            box = (float(pts["x"]), float(pts["y"]), float(pts["width"]), float(pts["height"]))
+        except Exception:
+            warnings += 1
+            continue
+        # NaN/Infinity 좌표나 너비/높이가 0 이하인 박스는 제외
+        if not all(map(math.isfinite, box)) or box[2] <= 0 or box[3] <= 0:
+            warnings += 1
+            continue
+
+        # (in 검사 후 다시 인덱싱하지 않고 한 번의 조회로 처리)
+        class_id = status_to_id.get((ann.get("object_status") or "").strip())
+        if class_id is None:
+            # 매핑 정보에 없는 상태값은 무시
+            warnings += 1
+            continue
+        boxes[n_box] = box
+        class_ids[n_box] = class_id
+        n_box += 1
+    del boxes[n_box:]
+    del class_ids[n_box:]
+    return boxes, class_ids, warnings
+
+def convert_one(jf: str, out_base, collect_boxes):
+    """
+    JSON 주석 파일 하나를 YOLO 라벨 파일로 변환합니다.
+    (ProcessPoolExecutor의 작업 단위로 사용되므로 모듈 최상위에 정의합니다.)
+
+    Args:
+        jf: 변환할 JSON 파일 경로
+        out_base: YOLO 라벨(.txt)을 저장할 폴더 경로 문자열 (경로 구분자로 끝남).
+            None이면 파일을 쓰지 않고 (파일명, 내용)을 반환합니다 (--out-tar 모드).
+        collect_boxes: 클래스 분류 모드에 맞춰 main()에서 고른 박스 수집 함수
+            (collect_boxes_single 또는 status_to_id가 바인딩된 collect_boxes_status)
+
+    Returns:
+        (converted, skipped, warnings, label) 튜플.
+        label은 out_base가 None이고 변환에 성공한 경우에만 (파일명, 내용 bytes), 그 외에는 None
+    """
+    converted = 0
+    skipped = 0
+    warnings = 0
+
+    try:
+        info, anns = load_annotation(jf)
+    except Exception as e:
+        print(f"[오류] JSON 파일을 읽을 수 없습니다: {jf} -> {e}", file=sys.stderr)
+        return converted, skipped + 1, warnings, None
+
+    # 이미지 메타데이터 파싱 (해상도, 파일명)
+    try:
+        img_w = float(info["resolution"]["width"])
+        img_h = float(info["resolution"]["height"])
+        img_name = info["filename"]
+    except Exception as e:
+        print(f"[오류] 필수 메타데이터 파싱 실패: {jf} -> {e}", file=sys.stderr)
+        return converted, skipped + 1, warnings, None
+
+    if img_w <= 0 or img_h <= 0:
+        print(f"[경고] 유효하지 않은 이미지 크기입니다: {jf} (w={img_w}, h={img_h})", file=sys.stderr)
+        return converted, skipped + 1, warnings + 1, None
+
+    # 박스마다 나눗셈을 하지 않도록 역수를 한 번만 계산
+    inv_w = 1.0 / img_w
+    inv_h = 1.0 / img_h
+
+    # 어노테이션 정보 처리 (BOX 타입만)
+    # 박스 좌표와 클래스 ID를 먼저 모은 뒤, 정규화는 NumPy로 한 번에 계산합니다.
+    boxes, class_ids, n_warn = collect_boxes(anns)
+    warnings += n_warn
+
+    # 유효한 라벨이 있는 경우에만 파일 생성 (정규화와 출력 경로 계산 전에 먼저 확인)
+    if not boxes:
+        # 라벨이 하나도 없는 빈 파일은 생성하지 않음
+        return converted, skipped, warnings + 1, None
+
+    # YOLO 형식으로 좌표 정규화 (0~1 사이 값)
+    # YOLO 포맷: <class_id> <x_center> <y_center> <width> <height>
+    arr = np.array(boxes, dtype=np.float64)
+    norm = get_norm_buf(len(boxes))
+    normalize_boxes(arr, inv_w, inv_h, norm)
+
+    # 전체 줄 형식을 하나로 이어 붙여 % 연산 한 번으로 모든 줄을 포맷
+    # (savetxt처럼 줄마다 포맷/쓰기를 반복하지 않음, 마지막 줄에는 개행 없음)
+    values = np.column_stack([np.asarray(class_ids, dtype=np.float64), norm]).ravel().tolist()
+    payload = ("\n".join([YOLO_LINE_FMT] * len(boxes)) % tuple(values)).encode("ascii")
+
+    # 변환된 라벨 파일 저장 (.txt)
+    # 파일명은 기존과 같은 규칙(Path.stem)으로 만들고, 폴더 경로만 미리 만든 문자열에 이어 붙임
+    label_name = Path(img_name).stem + ".txt"
+    if out_base is None:
+        # tar 모드: 파일은 부모 프로세스가 tar에 순서대로 기록
+        return converted + 1, skipped, warnings, (label_name, payload)
+
+    with open(out_base + label_name, "wb") as f:
+        f.write(payload)
+    return converted + 1, skipped, warnings, None
+
 def main():
     # 명령줄 인자 설정
     ap = argparse.ArgumentParser(description="AI-Hub JSON -> YOLO 라벨 변환기 (BOX만 사용)")
     ap.add_argument("--json-dir", type=Path, required=True, help="읽어올 주석 JSON 파일들이 있는 폴더 경로")
-    ap.add_argument("--out-labels", type=Path, required=True, help="생성된 YOLO 라벨(.txt) 파일을 저장할 폴더 경로")
+    # 출력 위치는 폴더(--out-labels) 또는 tar 파일(--out-tar) 중 하나만 지정
+    out_group = ap.add_mutually_exclusive_group(required=True)
+    out_group.add_argument("--out-labels", type=Path, help="생성된 YOLO 라벨(.txt) 파일을 저장할 폴더 경로")
+    out_group.add_argument("--out-tar", type=Path,
+                           help="라벨 파일들을 개별 파일 대신 하나의 tar 파일로 저장할 경로")
     ap.add_argument("--class-mode", choices=["single", "status"], default="single",
                     help="클래스 분류 모드 (single: 단일 클래스(0), status: 상태값 기반 다중 클래스)")
     ap.add_argument("--status-map", type=str, default="NM:0,AB:1",
                     help="class-mode가 'status'일 때 사용할 매핑 정보 (기본값: 'NM:0,AB:1')")
     ap.add_argument("--write-classes", action="store_true",
-                    help="선택 시, out-labels 상위 폴더에 classes.txt 파일을 함께 생성합니다")
+                    help="선택 시, out-labels 상위 폴더(--out-tar 사용 시 tar 파일과 같은 폴더)에 classes.txt 파일을 함께 생성합니다")
+    ap.add_argument("--workers", type=positive_int, default=os.cpu_count() or 1,
+                    help="변환에 사용할 프로세스 수 (기본값: CPU 코어 수)")
     args = ap.parse_args()
 
     json_dir: Path = args.json_dir
     out_labels: Path = args.out_labels
+    out_tar: Path = args.out_tar
     class_mode: str = args.class_mode
     status_map_str: str = args.status_map
 
-    # 출력 디렉토리 생성
-    ensure_dir(out_labels)
+    # 출력 디렉토리 생성 (tar 모드에서는 tar 파일이 위치할 폴더만 생성)
+    if out_tar is not None:
+        ensure_dir(out_tar.parent)
+    else:
+        ensure_dir(out_labels)
 
     # 상태 기반 매핑 정보 파싱 (다중 클래스 모드일 때만)
-    status_to_id = parse_status_map(status_map_str) if class_mode == "status" else {}
+    status_to_id = dict(parse_status_map(status_map_str)) if class_mode == "status" else {}
 
     converted = 0
     skipped = 0
     warnings = 0
 
-    # JSON 파일 순회
-    for jf in sorted(json_dir.glob("*.json")):
-        try:
-            with jf.open("r", encoding="utf-8") as f:
-                data = json.load(f)
-        except Exception as e:
-            print(f"[오류] JSON 파일을 읽을 수 없습니다: {jf} -> {e}", file=sys.stderr)
-            skipped += 1
-            continue
-
-        # 이미지 메타데이터 파싱 (해상도, 파일명)
-        try:
-            img_w = float(data["info"]["resolution"]["width"])
-            img_h = float(data["info"]["resolution"]["height"])
-            img_name = data["info"]["filename"]
-        except Exception as e:
-            print(f"[오류] 필수 메타데이터 파싱 실패: {jf} -> {e}", file=sys.stderr)
-            skipped += 1
-            continue
+    # JSON 파일별 변환을 여러 프로세스에 분산 처리
+    # (Path.glob 대신 os.scandir을 사용해 항목마다 Path 객체를 만들지 않음, 정렬은 로그 순서 재현용)
+    with os.scandir(json_dir) as it:
+        files = [e.path for e in it if e.name.endswith(".json") and e.is_file()]
+    files.sort()
+    # 클래스 모드 분기는 박스마다 하지 않고 여기서 한 번만 결정
+    if class_mode == "single":
+        collect_boxes = collect_boxes_single
+    else:
+        collect_boxes = partial(collect_boxes_status, status_to_id=status_to_id)
+    # 출력 폴더 경로는 한 번만 문자열로 만들어 두고, 파일별 경로는 문자열 연결로 구성
+    out_base = None if out_tar is not None else str(out_labels).rstrip("/\\") + os.sep
+    worker = partial(convert_one, out_base=out_base, collect_boxes=collect_boxes)
 
-        if img_w <= 0 or img_h <= 0:
-            print(f"[경고] 유효하지 않은 이미지 크기입니다: {jf} (w={img_w}, h={img_h})", file=sys.stderr)
-            warnings += 1
-            skipped += 1
-            continue
-
-        # 어노테이션 정보 처리 (BOX 타입만)
-        anns = data.get("annotation", [])
-        yolo_lines = []
-        for ann in anns:
-            if ann.get("annotation_type") != "BOX":
-                # BOX가 아닌 타입(예: POLYGON)은 건너뜁니다
-                continue
-            
-            # 좌표 정보 추출
-            pts = ann.get("points", {})
-            try:
-                x = float(pts["x"])
-                y = float(pts["y"])
-                w = float(pts["width"])
-                h = float(pts["height"])
-            except Exception:
-                warnings += 1
-                continue
-
-            if w <= 0 or h <= 0:
-                warnings += 1
-                continue
-
-            # YOLO 형식으로 좌표 정규화 (0~1 사이 값)
-            # YOLO 포맷: <class_id> <x_center> <y_center> <width> <height>
-            x_center = (x + w / 2.0) / img_w
-            y_center = (y + h / 2.0) / img_h
-            w_norm = w / img_w
-            h_norm = h / img_h
-
-            # 값을 0.0과 1.0 사이로 클리핑하여 오차 방지
-            def clip01(v): return max(0.0, min(1.0, v))
-            x_center = clip01(x_center)
-            y_center = clip01(y_center)
-            w_norm = clip01(w_norm)
-            h_norm = clip01(h_norm)
-
-            # 클래스 ID 결정
-            if class_mode == "single":
-                class_id = 0
-            else:
-                status = (ann.get("object_status") or "").strip()
-                if status not in status_to_id:
-                    # 매핑 정보에 없는 상태값은 무시
-                    warnings += 1
-                    continue
-                class_id = status_to_id[status]
-
-            yolo_lines.append(f"{class_id} {x_center:.6f} {y_center:.6f} {w_norm:.6f} {h_norm:.6f}")
-
-        # 변환된 라벨 파일 저장 (.txt)
-        stem = Path(img_name).stem
-        out_file = out_labels / f"{stem}.txt"
-        
-        # 유효한 라벨이 있는 경우에만 파일 생성
-        if yolo_lines:
-            out_file.write_text("\n".join(yolo_lines), encoding="utf-8")
-            converted += 1
-        else:
-            # 라벨이 하나도 없는 빈 파일은 생성하지 않음
-            warnings += 1
+    # tar 모드: 워커가 돌려준 라벨 내용을 부모 프로세스에서 하나의 tar에 순서대로 기록
+    tf = tarfile.open(out_tar, "w") if out_tar is not None else None
+    mtime = time.time()
+    try:
+        with ProcessPoolExecutor(max_workers=args.workers) as executor:
+            for conv, skip, warn, label in executor.map(worker, files, chunksize=64):
+                converted += conv
+                skipped += skip
+                warnings += warn
+                if label is not None:
+                    name, payload = label
+                    ti = tarfile.TarInfo(name=name)
+                    ti.size = len(payload)
+                    ti.mtime = mtime
+                    tf.addfile(ti, io.BytesIO(payload))
+    finally:
+        if tf is not None:
+            tf.close()
 
     print(f"[완료] 총 변환됨: {converted}개, 건너뜀: {skipped}개, 경고: {warnings}건")
 
     # (선택 사항) classes.txt 파일 생성
     if args.write_classes:
-        cls_path = out_labels.parent / "classes.txt"
+        # (tar 모드에서는 tar 파일과 같은 폴더에 생성)
+        cls_path = out_tar.parent / "classes.txt" if out_tar is not None else out_labels.parent / "classes.txt"
         if class_mode == "single":
             cls_path.write_text("갈색거저리\n", encoding="utf-8")
         else:
             # 상태 매핑 정보(ID 순서)대로 클래스 이름 기록
-            inv = {v: k for k, v in status_to_id.items()}
-            max_id = max(inv.keys()) if inv else -1
-            lines = []
-            for i in range(max_id + 1):
-                label = inv.get(i, f"cls_{i}")
-                lines.append(label)
+            lines = status_class_names(status_map_str)
             cls_path.write_text("\n".join(lines) + "\n", encoding="utf-8")
         print(f"[정보] classes.txt 파일이 작성되었습니다: {cls_path}")
 
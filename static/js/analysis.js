@@ -252,69 +252,117 @@ document.addEventListener('DOMContentLoaded', () => {
     }
 
     // 5. 서버에서 영상 상세 정보 가져오기
-    fetch(`/api/videos/${videoId}`)
-        .then((response) => {
-            if (!response.ok) throw new Error('Video not found');
-            return response.json();
-        })
-        .then((video) => {
-            // 파일명 표시
-            if (filenameEl) {
-                const displayName =
-                    video.original_filename || video.filename || '(파일명 없음)';
-                filenameEl.textContent = displayName;
-            }
+    // 분석 진행 중일 때 상태를 다시 조회하는 간격 (밀리초)
+    // 처음에는 3초 간격으로 조회하고, 조회할 때마다 간격을 늘려 최대 30초까지 늦춥니다.
+    const POLL_INTERVAL_MS = 3000;
+    const POLL_MAX_INTERVAL_MS = 30000;
+    const POLL_BACKOFF = 1.5;
+    // 이 시간이 지나도 분석이 끝나지 않으면 조회를 멈춤 (서버 재시작으로 작업이 사라진 경우 등)
+    const POLL_TIMEOUT_MS = 30 * 60 * 1000;
+    // 네트워크 오류 등 일시적인 조회 실패는 이 횟수까지 다시 시도한 뒤 오류를 표시
+    const FETCH_MAX_RETRIES = 3;
+
+    let pollDelay = POLL_INTERVAL_MS;
+    let fetchFailures = 0;
+    const pollStartedAt = Date.now();
+
+    // 다음 조회 예약 (간격을 점점 늘림)
+    function scheduleNextLoad() {
+        setTimeout(loadVideo, pollDelay);
+        pollDelay = Math.min(pollDelay * POLL_BACKOFF, POLL_MAX_INTERVAL_MS);
+    }
 
-            // 메타데이터 표시 (ID, 농장 ID)
-            if (videoIdEl) videoIdEl.textContent = video._id || videoId;
-            if (farmIdEl) farmIdEl.textContent = video.farm_id || '-';
+    function loadVideo() {
+        fetch(`/api/videos/${videoId}`)
+            .then((response) => {
+                if (!response.ok) {
+                    const err = new Error(`HTTP ${response.status}`);
+                    // 404 등 클라이언트 오류는 다시 시도해도 결과가 같으므로 바로 오류로 처리
+                    err.permanent = response.status >= 400 && response.status < 500;
+                    throw err;
+                }
+                return response.json();
+            })
+            .then((video) => {
+                fetchFailures = 0;
+
+                // 파일명 표시
+                if (filenameEl) {
+                    const displayName =
+                        video.original_filename || video.filename || '(파일명 없음)';
+                    filenameEl.textContent = displayName;
+                }
 
-            // 업로드 일시 표시
-            if (createdAtEl) {
-                const c = video.created_at;
-                let dateObj = null;
+                // 메타데이터 표시 (ID, 농장 ID)
+                if (videoIdEl) videoIdEl.textContent = video._id || videoId;
+                if (farmIdEl) farmIdEl.textContent = video.farm_id || '-';
+
+                // 업로드 일시 표시
+                if (createdAtEl) {
+                    const c = video.created_at;
+                    let dateObj = null;
+
+                    if (c && typeof c === 'object' && c['$date']) {
+                        dateObj = new Date(c['$date']);
+                    } else if (typeof c === 'string') {
+                        dateObj = new Date(c);
+                    }
+
+                    if (dateObj && !Number.isNaN(dateObj.getTime())) {
+                        createdAtEl.textContent = dateObj.toLocaleString();
+                    } else {
+                        createdAtEl.textContent = '-';
+                    }
+                }
 
-                if (c && typeof c === 'object' && c['$date']) {
-                    dateObj = new Date(c['$date']);
-                } else if (typeof c === 'string') {
-                    dateObj = new Date(c);
+                // 영상 길이 표시
+                if (durationEl) {
+                    if (video.duration != null) {
+                        durationEl.textContent = `${video.duration}s`;
+                    } else {
+                        durationEl.textContent = '-';
+                    }
                 }
 
-                if (dateObj && !Number.isNaN(dateObj.getTime())) {
-                    createdAtEl.textContent = dateObj.toLocaleString();
-                } else {
-                    createdAtEl.textContent = '-';
+                // 상태 뱃지 및 키프레임 슬라이더 업데이트
+                applyStatus(video);
+                renderKeyframes(video);
+
+                // 분석은 서버에서 백그라운드로 진행되므로, 끝날 때까지 주기적으로 다시 조회
+                if (video.status === 'uploaded' || video.status === 'processing') {
+                    if (Date.now() - pollStartedAt < POLL_TIMEOUT_MS) {
+                        scheduleNextLoad();
+                    } else if (statusText) {
+                        statusText.textContent =
+                            '분석이 지연되고 있습니다. 잠시 후 페이지를 새로고침해 주세요.';
+                    }
+                }
+            })
+            .catch((error) => {
+                console.error('Error:', error);
+
+                // 일시적인 오류는 오류 화면으로 바꾸지 않고 잠시 후 다시 시도
+                if (!error.permanent && fetchFailures < FETCH_MAX_RETRIES) {
+                    fetchFailures += 1;
+                    scheduleNextLoad();
+                    return;
                 }
-            }
 
-            // 영상 길이 표시
-            if (durationEl) {
-                if (video.duration != null) {
-                    durationEl.textContent = `${video.duration}s`;
-                } else {
-                    durationEl.textContent = '-';
+                if (filenameEl) filenameEl.textContent = '오류 발생';
+                if (statusText)
+                    statusText.textContent =
+                        '영상을 불러올 수 없습니다. 잠시 후 다시 시도해 주세요.';
+
+                if (keyframesContainer) {
+                    keyframesContainer.innerHTML = '';
+                    const msg = document.createElement('div');
+                    msg.className =
+                        'rounded-xl bg-red-500/10 p-8 text-center text-sm text-red-500 dark:bg-red-500/10 dark:text-red-400';
+                    msg.textContent = '영상 정보를 불러오는 중 오류가 발생했습니다.';
+                    keyframesContainer.appendChild(msg);
                 }
-            }
+            });
+    }
 
-            // 상태 뱃지 및 키프레임 슬라이더 업데이트
-            applyStatus(video);
-            renderKeyframes(video);
-        })
-        .catch((error) => {
-            console.error('Error:', error);
-
-            if (filenameEl) filenameEl.textContent = '오류 발생';
-            if (statusText)
-                statusText.textContent =
-                    '영상을 불러올 수 없습니다. 잠시 후 다시 시도해 주세요.';
-
-            if (keyframesContainer) {
-                keyframesContainer.innerHTML = '';
-                const msg = document.createElement('div');
-                msg.className =
-                    'rounded-xl bg-red-500/10 p-8 text-center text-sm text-red-500 dark:bg-red-500/10 dark:text-red-400';
-                msg.textContent = '영상 정보를 불러오는 중 오류가 발생했습니다.';
-                keyframesContainer.appendChild(msg);
-            }
-        });
+    loadVideo();
 });